@@ -0,0 +1,19 @@
+from functools import lru_cache
+from pathlib import Path
+
+import yaml
+
+CONFIG_PATH = Path(__file__).resolve().parent.parent / 'config.yaml'
+
+@lru_cache(maxsize=1)
+def load_config():
+    """
+    Load the configuration from the 'config.yaml' file.
+
+    The file is parsed only once per process, using the libyaml C loader when it is available.
+
+    Returns:
+        dict: The parsed configuration.
+    """
+    with open(CONFIG_PATH, 'r') as file:
+        return yaml.load(file, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader))
@@ -0,0 +1,63 @@
+from zipfile import ZipFile, BadZipFile
+import zipfile
+import mmap
+import os
+
+# This module must not import arcpy: extraction workers import it when they start, and
+# on Windows (spawn) importing arcpy would cost every worker seconds and a license checkout.
+
+def init_worker():
+    """
+    Initializer of the extraction worker processes.
+
+    Inflates zip members with ISA-L (SIMD accelerated) when available. Only the decompressor
+    is swapped, zipfile keeps using zlib.crc32. The patch is applied in the workers only, so
+    zipfile in the main process is left untouched.
+    """
+    try:
+        from isal import isal_zlib
+    except ImportError:
+        return
+    zipfile.zlib = isal_zlib
+
+class _MappedFile(mmap.mmap):
+    """
+    Read-only memory map usable as a ZipFile source (mmap lacks seekable() before Python 3.13).
+    """
+    def seekable(self):
+        return True
+
+def extract_zip_file(zip_file, unpacked_path, to_extract, suffixes):
+    """
+    Extract specific files from a zip file into the unpacked_path directory.
+
+    The zip file is memory-mapped, so the central directory and member data are read
+    from the mapped pages instead of through buffered file reads.
+
+    Kept at module level so it can be pickled and run in a worker process.
+
+    Args:
+        zip_file (Path): Path to the zip file to extract from.
+        unpacked_path (Path): Directory to extract the files into.
+        to_extract (frozenset): Filenames to extract from members in the archive root.
+        suffixes (tuple): The same filenames prefixed with '/', to extract from members in folders.
+
+    Returns:
+        list: Names of the extracted zip members.
+    """
+    extracted = []
+    with open(zip_file, 'rb') as f:
+        # An empty file cannot be mapped, and seeking past the end of a truncated file raises
+        # ValueError on a mapping; report both as BadZipFile, like a buffered read would
+        if os.fstat(f.fileno()).st_size == 0:
+            raise BadZipFile(f'File is empty: {zip_file}')
+        try:
+            with _MappedFile(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, \
+                    ZipFile(mm) as zf:
+                for info in zf.infolist():
+                    if info.filename.endswith(suffixes) or info.filename in to_extract:
+                        zf.extract(info, unpacked_path)
+                        extracted.append(info.filename)
+        except ValueError as e:
+            raise BadZipFile(f'File is not a zip file or is truncated: {zip_file}') from e
+    return extracted
@@ -1,70 +1,144 @@
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urljoin
 from pathlib import Path
+import threading
+import shutil
+
 from tqdm import tqdm
-import yaml
+import lxml.html
+import requests
+import logging
+
+from entities._config import load_config
+
+KU_URL = 'https://services.cuzk.cz/shp/ku/epsg-5514/'
 
 class KuDownloader:
     """
-    A class to download KUs from a specified URL using Selenium and Chrome WebDriver.
+    A class to download KUs from a specified URL using concurrent HTTP requests.
 
     The KuDownloader class loads the configuration from 'config.yaml', which includes:
     - download_path: The directory path to store downloaded files.
-    - chrome_driver_path: The path to the Chrome WebDriver executable.
     - download_list: A list of KU numbers used to filter and download specific KUs.
+    - download_workers: Optional number of concurrent downloads (defaults to 16).
 
-    The class provides methods to download all KUs available on the specified URL and
-    download specific KUs based on the download_list. It uses Selenium to interact with the webpage.
+    The class scrapes the zip links from the KU directory listing once and then downloads
+    the zip files in parallel using a thread pool of requests sessions.
 
     Dependencies:
-    - Selenium: For web automation.
+    - requests: For fetching the directory listing and the zip files.
+    - lxml: For parsing the directory listing.
     - pathlib: For working with file paths.
     - tqdm: For displaying download progress.
-    - yaml: For loading configuration from 'config.yaml'.
+    - _config.load_config: For loading configuration from 'config.yaml'.
     - ku_parser.KUParser: A class to parse and process downloaded KU files.
 
     Usage:
     - Create an instance of the KuDownloader class.
     - Call the 'download_all_kus()' method to download all KUs available on the URL.
-    - Call the 'download_kus_for_list()' method to download specific KUs based on the download_list.
+    - Iterate 'iter_download_all_kus()' to process each zip file as soon as it is downloaded.
     """
-    
-    
+
+    max_workers = 16
+
     def __init__(self):
         """
         Initialize the KuDownloader class by loading the configuration from the 'config.yaml' file.
 
         Configuration includes:
         - download_path: The directory path to store downloaded files.
-        - chrome_driver_path: The path to the Chrome WebDriver executable.
+        - download_list: A list of KUs to be downloaded.
+        - download_workers: Optional number of concurrent downloads.
         """
-        config_file_path = Path(
-            __file__).resolve().parent.parent / 'config.yaml'
-        with open(config_file_path, 'r') as file:
-            config = yaml.safe_load(file)
+        config = load_config()
 
         self.download_path = Path(config['download_path']).resolve()
         if not self.download_path.exists():
             d_path = Path(__file__).parent.parent/self.download_path
             d_path.mkdir()
 
-        options = webdriver.ChromeOptions()
-        prefs = {'download.default_directory': str(self.download_path)}
-        options.add_experimental_option("prefs", prefs)
-        self.driver = webdriver.Chrome(options=options)
         self.download_list = config['download_list']
+        self.max_workers = config.get('download_workers', self.max_workers)
+        self._local = threading.local()
 
-    def download_all_kus(self):
+    def _session(self):
         """
-        Download all KUs available on the specified URL.
+        Return the requests session of the current thread, so connections are kept alive
+        between downloads handled by the same worker.
+        """
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def get_ku_urls(self):
+        """
+        Scrape the URLs of all KU zip files listed on the specified URL.
+
+        Returns:
+            list: Absolute URLs of the zip files.
+        """
+        response = requests.get(KU_URL, timeout=30)
+        response.raise_for_status()
+        tree = lxml.html.fromstring(response.content)
+        return [urljoin(KU_URL, href) for href in tree.xpath('//a/@href')
+                if href.endswith('.zip')]
+
+    def _download_one(self, url):
+        """
+        Stream a single zip file straight to the 'download_path' directory.
+
+        A partially written file is removed when the download fails.
+
+        Args:
+            url (str): URL of the zip file to download.
+
+        Returns:
+            Path: Path of the downloaded file.
+        """
+        ku_file = self.download_path / url.rsplit('/', 1)[-1]
+        try:
+            with self._session().get(url, stream=True, timeout=60) as r:
+                r.raise_for_status()
+                # Undo any Content-Encoding (e.g. gzip) of the response, as r.content would
+                r.raw.decode_content = True
+                with open(ku_file, 'wb') as f:
+                    shutil.copyfileobj(r.raw, f, length=1 << 20)
+        except Exception:
+            ku_file.unlink(missing_ok=True)
+            raise
+        return ku_file
+
+    def iter_download_all_kus(self):
+        """
+        Download all KUs available on the specified URL, yielding each zip file as soon as it is downloaded.
 
         KUs will be downloaded to the 'download_path' directory specified in the configuration.
+
+        Yields:
+            Path: Path of each downloaded zip file, in order of completion.
         """
         try:
-            self.driver.get('https://services.cuzk.cz/shp/ku/epsg-5514/')
-            x = self.driver.find_elements(By.CSS_SELECTOR, 'a')
-            for link in tqdm(x[2:], desc='Downloading KUs', unit='KU'):
-                link.click()
+            urls = self.get_ku_urls()
         except Exception as e:
             raise Exception(f"Error occurred while downloading KUs. Error: {e}") from e
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self._download_one, url): url for url in urls}
+            for future in tqdm(as_completed(futures), total=len(futures),
+                               desc='Downloading KUs', unit='KU'):
+                try:
+                    ku_file = future.result()
+                except Exception as e:
+                    logging.warning(f'Error downloading KU: {futures[future]}. Error: {e}')
+                    continue
+                yield ku_file
+
+    def download_all_kus(self):
+        """
+        Download all KUs available on the specified URL.
+
+        KUs will be downloaded to the 'download_path' directory specified in the configuration.
+        """
+        for _ in self.iter_download_all_kus():
+            pass
@@ -1,11 +1,177 @@
-from zipfile import ZipFile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from multiprocessing import Pool
+from contextlib import closing
 from pathlib import Path
 
 from tqdm import tqdm
-import yaml
 import logging
 import arcpy
+import threading
+import tempfile
+import sqlite3
+import queue
 import shutil
+import os
+
+from entities._config import load_config
+from entities import _extract
+
+XY_DOMAIN = "-916406 -1234597 -419902 -738093"
+
+# Scratch directory of the spatial join worker processes, set by _init_join_worker, and the
+# scratch GDB of the current worker process, created by its first join
+_scratch_path = None
+_scratch_gdb = None
+
+def _set_arcpy_env():
+    """
+    Set the arcpy environment shared by the main process and the spatial join workers.
+
+    Copying domains, attribute properties and attachments and maintaining the spatial index
+    are skipped for every output; the spatial index of 'KU' is rebuilt once after the upload.
+    Geoprocessing history logging is disabled, so the per-KU tool calls do not write history.
+    """
+    arcpy.SetLogHistory(False)
+    arcpy.env.XYDomain = XY_DOMAIN
+    # Allow overwriting of output
+    arcpy.env.overwriteOutput = True
+    arcpy.env.transferDomains = False
+    arcpy.env.transferGDBAttributeProperties = False
+    arcpy.env.maintainAttachments = False
+    arcpy.env.maintainSpatialIndex = False
+
+def _spatial_join_ku(ku_path, joined_fc):
+    """
+    Spatially join the parcels of a single unpacked KU folder.
+
+    Args:
+        ku_path (Path): Path to the unpacked KU folder.
+        joined_fc (str): Feature class to write the spatial join result to.
+
+    Returns:
+        str: The joined_fc feature class.
+    """
+    target_fc = ku_path / 'PARCELY_KN_P.shp'
+    join_fc = ku_path / 'PARCELY_KN_DEF.shp'
+    arcpy.analysis.SpatialJoin(str(target_fc.resolve()), 
+                               str(join_fc.resolve()), 
+                               joined_fc,
+                                'JOIN_ONE_TO_ONE', 
+                               )
+    return joined_fc
+
+def _init_join_worker(scratch_path):
+    """
+    Remember the directory the current worker process creates its scratch GDB in.
+
+    Nothing that can fail is done here: an initializer that raises makes the pool replace
+    the worker over and over, so the scratch GDB is created by the first join instead.
+
+    Args:
+        scratch_path (Path): Directory to create the scratch GDB in.
+    """
+    global _scratch_path
+    _scratch_path = scratch_path
+
+def _worker_scratch_gdb():
+    """
+    Return the scratch GDB of the current worker process, creating it and pointing the arcpy
+    workspace to it on the first call.
+
+    Returns:
+        Path: Path to the scratch GDB.
+    """
+    global _scratch_gdb
+    if _scratch_gdb is None:
+        gdb_name = f'worker_{os.getpid()}.gdb'
+        arcpy.CreateFileGDB_management(str(_scratch_path), gdb_name)
+        arcpy.env.workspace = str(_scratch_path / gdb_name)
+        _set_arcpy_env()
+        _scratch_gdb = _scratch_path / gdb_name
+    return _scratch_gdb
+
+def _join_worker(ku_path):
+    """
+    Spatially join a single KU into the scratch GDB of the current worker process.
+
+    The join is written to the scratch GDB rather than the 'memory' workspace, because the
+    main process has to read it and in-memory workspaces are private to each process.
+
+    Errors, including a failure to create the scratch GDB, are returned rather than raised
+    so one bad KU does not stop the pool.
+
+    Args:
+        ku_path (Path): Path to the unpacked KU folder.
+
+    Returns:
+        tuple: The KU path, the joined feature class (None on error) and the error message (None on success).
+    """
+    try:
+        return ku_path, _spatial_join_ku(ku_path, str(_worker_scratch_gdb() / f'KU_{ku_path.name}')), None
+    except Exception as e:
+        return ku_path, None, str(e)
+
+def _feed_zip_files(zip_files, events):
+    """
+    Put each zip file onto the events queue as ('zip', path), then ('end', None).
+
+    An error raised while iterating zip_files is put as ('error', exception) before the end marker.
+
+    Args:
+        zip_files (iterable): Paths of the zip files, possibly a lazy generator of downloads.
+        events (queue.Queue): Queue to put the events onto.
+    """
+    try:
+        for zip_file in zip_files:
+            events.put(('zip', zip_file))
+    except Exception as e:
+        events.put(('error', e))
+    events.put(('end', None))
+
+def _submit_joins(pool, ku_paths, events, stop):
+    """
+    Submit a spatial join to the pool for each KU path, then put ('end', count) onto the events queue.
+
+    Each join result is put as ('result', (ku_path, joined_fc, error)). An error raised while
+    iterating ku_paths is put as ('error', exception) before the end marker. Iteration stops
+    early once the stop event is set.
+
+    ku_paths is iterated and closed in this thread only, so a generator holding resources
+    (e.g. the manifest of 'iter_extract_zip_files()') is cleaned up by the thread that ran it.
+
+    Args:
+        pool (multiprocessing.pool.Pool): Pool of spatial join workers.
+        ku_paths (iterable): Paths of the KU folders, possibly a lazy generator.
+        events (queue.Queue): Queue to put the events onto.
+        stop (threading.Event): Set to stop submitting joins.
+    """
+    count = 0
+    try:
+        for ku_path in ku_paths:
+            if stop.is_set():
+                break
+            pool.apply_async(_join_worker, (ku_path,),
+                             callback=lambda result: events.put(('result', result)),
+                             error_callback=lambda e, ku_path=ku_path: events.put(('result', (ku_path, None, str(e)))))
+            count += 1
+    except Exception as e:
+        events.put(('error', e))
+    finally:
+        if hasattr(ku_paths, 'close'):
+            ku_paths.close()
+    events.put(('end', count))
+
+def _clear_dir(path):
+    """
+    Remove all files of a folder, leaving its subfolders in place.
+
+    Args:
+        path (str): Path to the folder to clear.
+    """
+    with os.scandir(path) as it:
+        for entry in it:
+            if not entry.is_dir(follow_symlinks=False):
+                os.unlink(entry.path)
 
 class KUParser:
     """
@@ -13,7 +179,6 @@ class KUParser:
 
     The KUParser class loads the configuration from 'config.yaml', which includes:
     - download_path: The directory path to store downloaded files.
-    - chrome_driver_path: The path to the Chrome WebDriver executable.
     - gdb_path: The path to the Geodatabase (GDB) where data will be uploaded.
 
     The class provides methods to extract specific files from the downloaded zip and
@@ -21,20 +186,43 @@ class KUParser:
     and uploads the data to the specified Geodatabase (GDB).
 
     Dependencies:
-    - zipfile.ZipFile: For extracting files from zip archives.
+    - _extract.extract_zip_file: For extracting files from zip archives.
     - pathlib: For working with file paths.
     - tqdm: For displaying extraction and processing progress.
-    - yaml: For loading configuration from 'config.yaml'.
+    - _config.load_config: For loading configuration from 'config.yaml'.
     - logging: For logging warnings during extraction.
     - arcpy: For processing and uploading data to the Geodatabase.
 
     Usage:
     - Create an instance of the KUParser class.
     - Call the 'extract_zip_files()' method to extract specific files from the downloaded zip.
+    - Iterate 'iter_extract_zip_files()' to process each KU folder as soon as it is extracted.
     - Call the 'upload_data_to_gdb()' method to upload extracted data to the Geodatabase.
     - Call the 'remove_zip_files()' method to remove all zip files in the download_path directory.
     - Call the 'process_single_ku()' method to process a single KU folder in the unpacked directory.
+    - Call the 'append_to_ku()' method to load processed KUs into the 'KU' feature class.
     """
+
+    # Files to extract from each downloaded zip
+    _TO_EXTRACT: frozenset = frozenset({'PARCELY_KN_DEF.cpg',
+                                        'PARCELY_KN_DEF.dbf',
+                                        'PARCELY_KN_DEF.prj',
+                                        'PARCELY_KN_DEF.shp',
+                                        'PARCELY_KN_DEF.shx',
+                                        'PARCELY_KN_P.cpg',
+                                        'PARCELY_KN_P.dbf',
+                                        'PARCELY_KN_P.prj',
+                                        'PARCELY_KN_P.shp',
+                                        'PARCELY_KN_P.shx',
+                                        })
+    # Members in a folder match on the '/'-prefixed suffix, members in the archive root by name
+    _SUFFIXES: tuple = tuple('/' + name for name in _TO_EXTRACT)
+
+    # Manifest of extracted zip files, kept in the 'unpacked' directory
+    _MANIFEST_NAME = '.manifest.sqlite'
+
+    append_batch_size = 1000
+    remove_workers = 32
     
     def __init__(self):
         """
@@ -42,93 +230,216 @@ class KUParser:
 
         Configuration includes:
         - download_path: The directory path to store downloaded files.
-        - chrome_driver_path: The path to the Chrome WebDriver executable.
-        - download_list: A list of KUs to be downloaded.
+        - gdb_path: The path to the Geodatabase (GDB) where data will be uploaded.
         """
-        config_file_path = Path(
-            __file__).resolve().parent.parent / 'config.yaml'
-        with open(config_file_path, 'r') as file:
-            config = yaml.safe_load(file)
+        config = load_config()
         
         self.download_path = Path(config['download_path']).resolve()
         self.unpacked_path = self.download_path / "unpacked"
         self.gdb_path = Path(config['gdb_path']).resolve()
     
+    def _iter_zips(self):
+        """
+        Yield the paths of all zip files in the download_path directory.
+
+        Uses os.scandir, so the file type comes from the directory entry without an extra stat call.
+        """
+        with os.scandir(self.download_path) as it:
+            for entry in it:
+                if entry.name.endswith('.zip') and entry.is_file():
+                    yield Path(entry.path)
+
     def remove_zip_files(self, ku_list=None):
         """
         Remove all zip files in the download_path directory.
 
         If ku_list is specified, only the zip files with filenames present in ku_list will be removed.
+        The files are removed concurrently by a pool of 'remove_workers' threads.
         """
         if ku_list is None:
-            ku_list = self.download_path.glob('*.zip')
-        for ku in tqdm(ku_list, desc='Removing zip files', unit='zip'):
-            try:
-                ku.unlink()
-            except Exception as e:
-                logging.warning(f'Error removing zip file: {ku}. Error: {e}')
+            ku_list = list(self._iter_zips())
+        with ThreadPoolExecutor(max_workers=self.remove_workers) as executor:
+            futures = {executor.submit(ku.unlink): ku for ku in ku_list}
+            for future in tqdm(as_completed(futures), total=len(futures),
+                               desc='Removing zip files', unit='zip'):
+                try:
+                    future.result()
+                except Exception as e:
+                    logging.warning(f'Error removing zip file: {futures[future]}. Error: {e}')
         return
     
     def remove_unpacked_files(self):
         """
         Remove unpacked folder
+
+        The files of all folders are removed concurrently by a pool of 'remove_workers' threads,
+        then the emptied folders are removed bottom-up.
         """
         try:
-            shutil.rmtree(self.unpacked_path)
+            dirs = [dirpath for dirpath, _, _ in os.walk(self.unpacked_path, topdown=False)]
+            if not dirs:
+                raise FileNotFoundError(f'No such directory: {self.unpacked_path}')
+            with ThreadPoolExecutor(max_workers=self.remove_workers) as executor:
+                list(executor.map(_clear_dir, dirs))
+            for dirpath in dirs:
+                os.rmdir(dirpath)
             print(f'Removed unpacked folder: {self.unpacked_path}')
         except Exception as e:
             logging.warning(f'Error removing unpacked folder: {self.unpacked_path}. Error: {e}')
         return
             
-    def extract_zip_file(self, zip_file, to_extract):
+    def extract_zip_file(self, zip_file, to_extract=None):
         """
         Extract specific files from a downloaded zip file and store them in the 'unpacked' directory.
 
         Args:
             zip_file (str): Path to the zip file to extract from.
-            to_extract (list): List of filenames to extract from the zip file.
-        """
-        with ZipFile(zip_file) as zf:
-            files_to_extract = filter(lambda x: x.filename.split('/')[-1] in to_extract,
-                                      zf.infolist())
-            zf.extractall(path=self.unpacked_path,
-                          members=files_to_extract)
-        zf.close()
+            to_extract (list): List of filenames to extract from the zip file. Defaults to the parcel shapefiles.
+        """
+        if to_extract is None:
+            to_extract, suffixes = self._TO_EXTRACT, self._SUFFIXES
+        else:
+            to_extract = frozenset(to_extract)
+            suffixes = tuple('/' + name for name in to_extract)
+        _extract.extract_zip_file(zip_file, self.unpacked_path, to_extract, suffixes)
         return
 
     def extract_zip_files(self):
         """
         Extract specific files from the downloaded zip and store them in a directory named 'unpacked'.
+
+        The zip files are decompressed in parallel, one worker process per CPU core. Each
+        extracted zip is recorded in a manifest in the 'unpacked' directory, so when the
+        extraction is run again, zips that were already extracted and have not changed since
+        are skipped.
+        """
+        zip_files = list(self._iter_zips())
+        with tqdm(total=len(zip_files),
+                  desc='Unpacking zip files',
+                  unit='zip',
+                  ) as progress:
+            for _ in self.iter_extract_zip_files(zip_files, progress=progress):
+                pass
+        return
+
+    def iter_extract_zip_files(self, zip_files=None, progress=None):
+        """
+        Extract specific files from the given zip files into the 'unpacked' directory, yielding
+        each KU folder as soon as its zip is extracted.
+
+        The zip files are consumed lazily, so they can be extracted while they are still being
+        downloaded (e.g. from 'KuDownloader.iter_download_all_kus()'). Zips recorded in the
+        manifest as already extracted are not extracted again, but their KU folders are yielded.
+
+        Args:
+            zip_files (iterable): Paths of the zip files to extract. Defaults to all zip files in the download_path directory.
+            progress (tqdm): Optional progress bar, updated once per finished zip file (extracted, skipped or failed).
+
+        Yields:
+            Path: Path of each extracted KU folder.
         """
         self.unpacked_path = self.download_path / "unpacked"
         self.unpacked_path.mkdir(exist_ok=True)
+        if zip_files is None:
+            zip_files = self._iter_zips()
 
-        to_extract = ['PARCELY_KN_DEF.cpg',
-                      'PARCELY_KN_DEF.dbf',
-                      'PARCELY_KN_DEF.prj',
-                      'PARCELY_KN_DEF.shp',
-                      'PARCELY_KN_DEF.shx',
-                      'PARCELY_KN_P.cpg',
-                      'PARCELY_KN_P.dbf',
-                      'PARCELY_KN_P.prj',
-                      'PARCELY_KN_P.shp',
-                      'PARCELY_KN_P.shx',
-                      ]
-
-        zip_files = self.download_path.glob('*.zip')
-        for zip_file in tqdm(zip_files,
-                             desc='Unpacking zip files',
-                             unit='zip',
-                             ):
-            try:
-                self.extract_zip_file(zip_file, to_extract)
-            except Exception as e:
-                logging.warning(f'Error extracting zip file: {zip_file}')
+        with closing(self._open_manifest()) as manifest:
+            extracted = {(zip_path, mtime_ns): members for zip_path, mtime_ns, members
+                         in manifest.execute('SELECT zip_path, mtime_ns, members FROM extracted')}
+
+            # Zip files arrive from a feeder thread and finished extractions from done callbacks,
+            # so extracted KUs are handed over while waiting for the next zip file
+            events = queue.Queue()
+            threading.Thread(target=_feed_zip_files, args=(zip_files, events), daemon=True).start()
+            with ProcessPoolExecutor(max_workers=os.cpu_count(),
+                                     initializer=_extract.init_worker) as executor:
+                futures = {}
+                fed = False
+                while not fed or futures:
+                    kind, item = events.get()
+                    if kind == 'zip':
+                        try:
+                            mtime_ns = item.stat().st_mtime_ns
+                            members = extracted.get((str(item), mtime_ns))
+                        except Exception as e:
+                            logging.warning(f'Error extracting zip file: {item}. Error: {e}')
+                            if progress is not None:
+                                progress.update()
+                            continue
+                        if members is not None:
+                            if progress is not None:
+                                progress.update()
+                            yield from self._ku_folders(members.split('\n'))
+                            continue
+                        future = executor.submit(_extract.extract_zip_file, item, self.unpacked_path,
+                                                 self._TO_EXTRACT, self._SUFFIXES)
+                        futures[future] = (item, mtime_ns)
+                        future.add_done_callback(lambda f: events.put(('done', f)))
+                    elif kind == 'done':
+                        if progress is not None:
+                            progress.update()
+                        yield from self._record_extraction(manifest, item, *futures.pop(item))
+                    elif kind == 'error':
+                        raise item
+                    else:
+                        fed = True
         return
+
+    def _record_extraction(self, manifest, future, zip_file, mtime_ns):
+        """
+        Record a finished zip extraction in the manifest.
+
+        Args:
+            manifest (sqlite3.Connection): Connection to the manifest database.
+            future (Future): The finished '_extract.extract_zip_file' call.
+            zip_file (Path): Path to the extracted zip file.
+            mtime_ns (int): Modification time of the zip file.
+
+        Returns:
+            list: Paths of the extracted KU folders, empty if the extraction failed.
+        """
+        try:
+            members = future.result()
+        except Exception as e:
+            logging.warning(f'Error extracting zip file: {zip_file}. Error: {e}')
+            return []
+        with manifest:
+            manifest.execute('INSERT OR REPLACE INTO extracted VALUES (?, ?, ?)',
+                             (str(zip_file), mtime_ns, '\n'.join(members)))
+        return self._ku_folders(members)
+
+    def _ku_folders(self, members):
+        """
+        Return the KU folders in the 'unpacked' directory the given zip members were extracted to.
+
+        Args:
+            members (list): Names of the extracted zip members.
+
+        Returns:
+            list: Paths of the KU folders.
+        """
+        return [self.unpacked_path / name
+                for name in sorted({member.partition('/')[0] for member in members if '/' in member})]
+
+    def _open_manifest(self):
+        """
+        Open the manifest of extracted zip files stored in the 'unpacked' directory.
+
+        Returns:
+            sqlite3.Connection: Connection to the manifest database.
+        """
+        manifest = sqlite3.connect(self.unpacked_path / self._MANIFEST_NAME)
+        manifest.execute('PRAGMA journal_mode=WAL')
+        manifest.execute('CREATE TABLE IF NOT EXISTS extracted '
+                         '(zip_path TEXT PRIMARY KEY, mtime_ns INTEGER, members TEXT)')
+        return manifest
         
     def process_single_ku(self, ku_number=None):
         """
-        Process a single KU folder in the 'unpacked' directory.
+        Process a single KU folder in the 'unpacked' directory and load it into the 'KU' feature class.
+
+        The spatial join result is written to a temporary feature class in the 'memory' workspace,
+        loaded by 'append_to_ku()' and deleted afterwards.
 
         Args:
             ku_number (str): The KU number to process. If None, the user will be prompted to enter the KU number.
@@ -136,49 +447,145 @@ class KUParser:
         if ku_number is None:
             ku_number = input('Enter KU number: ')
 
-        target_fc = self.unpacked_path / ku_number / 'PARCELY_KN_P.shp'
-        join_fc = self.unpacked_path / ku_number / 'PARCELY_KN_DEF.shp'
-        arcpy.analysis.SpatialJoin(str(target_fc.resolve()), 
-                                   str(join_fc.resolve()), 
-                                   'in_memory/spatial_join',
-                                    'JOIN_ONE_TO_ONE', 
-                                   )
-        if arcpy.Exists(f'KU'):
-            arcpy.Append_management('in_memory/spatial_join', f'KU')
-        else:
-            arcpy.management.CopyFeatures('in_memory/spatial_join', f'KU')
-            
-        arcpy.Delete_management('in_memory/spatial_join')
-        
+        joined_fc = _spatial_join_ku(self.unpacked_path / ku_number, f'memory/sj_{ku_number}')
+        try:
+            self.append_to_ku([joined_fc])
+        finally:
+            arcpy.Delete_management(joined_fc)
         return
 
-        
-    def upload_data_to_gdb(self):
+    def _create_ku(self, template):
+        """
+        Create the empty 'KU' feature class with a schema that fits every KU.
+
+        The fields are taken from a spatial join result, but shapefile field widths differ
+        between KUs, so text fields are widened to the 254 characters a dbf field can hold
+        and 16-bit integer and single precision fields to their 32-bit and double precision
+        counterparts. The table is still empty, so the fields can be altered.
+
+        Args:
+            template (str): Spatial join feature class to take the fields from.
+        """
+        arcpy.management.CreateFeatureclass(str(self.gdb_path), f'KU', 'POLYGON',
+                                            template=template,
+                                            spatial_reference=arcpy.Describe(template).spatialReference)
+        for field in arcpy.ListFields(f'KU'):
+            if not field.editable or field.required:
+                continue
+            if field.type == 'String' and field.length < 254:
+                arcpy.management.AlterField(f'KU', field.name, field_length=254)
+            elif field.type == 'SmallInteger':
+                arcpy.management.AlterField(f'KU', field.name, field_type='LONG')
+            elif field.type == 'Single':
+                arcpy.management.AlterField(f'KU', field.name, field_type='DOUBLE')
+        return
+
+    def append_to_ku(self, joined):
+        """
+        Load a batch of spatial join results into the 'KU' feature class.
+
+        The rows are copied with insert cursors inside a single edit session, so the whole
+        batch is committed in one transaction. Each joined feature class is loaded in its own
+        edit operation: if it fails, the operation is aborted and a warning is logged, so an
+        error costs only that KU. If 'KU' does not exist yet, it is created by '_create_ku()'
+        from the first spatial join result.
+
+        Args:
+            joined (list): Paths of the spatial join feature classes to load.
+        """
+        if not joined:
+            return
+        if not arcpy.Exists(f'KU'):
+            self._create_ku(joined[0])
+
+        fields = ['SHAPE@'] + [f.name for f in arcpy.ListFields(f'KU')
+                               if f.editable and f.type != 'Geometry']
+        edit = arcpy.da.Editor(str(self.gdb_path))
+        edit.startEditing(False, False)
+        try:
+            for joined_fc in joined:
+                edit.startOperation()
+                try:
+                    with arcpy.da.SearchCursor(joined_fc, fields) as src, \
+                            arcpy.da.InsertCursor(f'KU', fields) as dst:
+                        for row in src:
+                            dst.insertRow(row)
+                except Exception as e:
+                    edit.abortOperation()
+                    logging.warning(f'Error uploading KU: {joined_fc}. Error: {e}')
+                    continue
+                edit.stopOperation()
+        finally:
+            edit.stopEditing(True)
+        return
+
+    def upload_data_to_gdb(self, ku_paths=None):
         """
         Upload data from unpacked KU folders to the Geodatabase (GDB).
 
-        The data will be uploaded to a feature class named 'KU' in the specified GDB.
+        The KUs are spatially joined in parallel worker processes and the data will be uploaded
+        to a feature class named 'KU' in the specified GDB, in batches of 'append_batch_size' KUs.
+
+        Args:
+            ku_paths (iterable): Paths of the KU folders to upload, consumed lazily (e.g. from
+                'iter_extract_zip_files()'). Defaults to all folders in the 'unpacked' directory.
         """
         if not self.gdb_path.exists():
             arcpy.CreateFileGDB_management(str(self.gdb_path.parent), self.gdb_path.name)
         else:
             arcpy.arcpy.Delete_management('KU')
         arcpy.env.workspace = str(self.gdb_path)
-        arcpy.env.XYDomain = "-916406 -1234597 -419902 -738093"
+        _set_arcpy_env()
         sr = arcpy.SpatialReference("S-JTSK_Krovak_East_North")
 
-        # Allow overwriting of output
-        arcpy.env.overwriteOutput = True
-
         # Setting up parallel processing
         arcpy.env.parallelProcessingFactor = "100%"
         
-        ku_names = self.unpacked_path.glob('*')
-        for ku in tqdm(ku_names, desc='Uploading data to GDB', unit='KU'):
-            try:
-                self.process_single_ku(ku.name)
-            except Exception as e:
-                logging.warning(f'Error processing KU: {ku.name}. Error: {e}')
+        # Spatial joins run in one process per core, each writing to its own scratch GDB
+        if ku_paths is None:
+            ku_paths = [ku for ku in self.unpacked_path.glob('*') if ku.is_dir()]
+        total = len(ku_paths) if isinstance(ku_paths, list) else None
+        scratch_path = Path(tempfile.mkdtemp(prefix='ku_scratch_'))
+        try:
+            with Pool(os.cpu_count(), initializer=_init_join_worker, initargs=(scratch_path,)) as pool:
+                # KU paths are consumed and submitted by a thread owned here, join results come
+                # back through the pool callbacks
+                events = queue.Queue()
+                stop = threading.Event()
+                submitter = threading.Thread(target=_submit_joins, args=(pool, ku_paths, events, stop))
+                submitter.start()
+                try:
+                    with tqdm(total=total, desc='Uploading data to GDB', unit='KU') as progress:
+                        joined = []
+                        submitted = None
+                        received = 0
+                        while submitted is None or received < submitted:
+                            kind, item = events.get()
+                            if kind == 'end':
+                                submitted = item
+                                continue
+                            if kind == 'error':
+                                raise item
+                            received += 1
+                            progress.update()
+                            ku, joined_fc, error = item
+                            if error is not None:
+                                logging.warning(f'Error processing KU: {ku.name}. Error: {error}')
+                                continue
+                            joined.append(joined_fc)
+                            if len(joined) >= self.append_batch_size:
+                                self.append_to_ku(joined)
+                                joined = []
+                        self.append_to_ku(joined)
+                finally:
+                    # Stop the submitter and wait until it has closed ku_paths, before the pool is terminated
+                    stop.set()
+                    submitter.join()
+        finally:
+            shutil.rmtree(scratch_path, ignore_errors=True)
+
+        if arcpy.Exists(f'KU'):
+            arcpy.AddSpatialIndex_management(f'KU')
 
         # Print the gdb file path
         print(f'Resulting GDB file path: {self.gdb_path}')
@@ -1,17 +1,17 @@
-from entities.ku_downloader import KuDownloader
-from entities.ku_parser import KUParser
-
 def download_and_process_kus():
+    # Imported here rather than at module level: on Windows, worker processes re-import
+    # this module, and the zip extraction workers must not pay for importing arcpy
+    from entities.ku_downloader import KuDownloader
+    from entities.ku_parser import KUParser
+
     try:
-        # Create an instance of the downloader
-        # Download the KUs zip files
+        # Create an instance of the downloader and the parser
         kd = KuDownloader()
-        kd.download_all_kus()
-
-        # Extract target files from the downloaded zip
         kp = KUParser()
-        kp.extract_zip_files()
-        kp.upload_data_to_gdb()
+
+        # Download the KUs zip files, extract target files from each zip as soon as it is
+        # downloaded and upload each KU to the GDB as soon as it is extracted
+        kp.upload_data_to_gdb(kp.iter_extract_zip_files(kd.iter_download_all_kus()))
         
         # Remove the zip files and unpacked files
         kp.remove_zip_files()